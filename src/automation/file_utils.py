@@ -2,14 +2,46 @@
 File utilities for Nova Act automation
 """
 import os
+import functools
 import shutil
+import stat
+import time
 import logging
 from pathlib import Path
-from typing import List, Optional, Tuple
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 import mimetypes
 
 logger = logging.getLogger(__name__)
 
+FILE_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# strftime format -> (epoch second, formatted text) for the last second it was used
+_second_timestamps: Dict[str, Tuple[int, str]] = {}
+
+def second_timestamp(fmt: str) -> str:
+    """Current local time truncated to the second, formatted with fmt and cached until the second changes"""
+    now = int(time.time())
+    cached = _second_timestamps.get(fmt)
+    if cached is None or cached[0] != now:
+        cached = _second_timestamps[fmt] = (now, datetime.fromtimestamp(now).strftime(fmt))
+    return cached[1]
+
+# Directories already created by this process
+_created_dirs = set()
+
+def _ensure_dir(directory: Path) -> None:
+    """Create a directory once per process instead of on every call"""
+    if directory not in _created_dirs:
+        directory.mkdir(exist_ok=True)
+        _created_dirs.add(directory)
+
+@functools.lru_cache(maxsize=128)
+def _mime_for_ext(extension: str) -> Optional[str]:
+    """Guess the MIME type from a lowercased extension, cached per extension"""
+    return mimetypes.guess_type('file' + extension)[0]
+
 class FileUtils:
     """Utility class for file operations"""
     
@@ -29,25 +61,25 @@ class FileUtils:
         Returns (is_valid, error_message)
         """
         try:
-            file_path = Path(file_path)
-            
-            # Check if file exists
-            if not file_path.exists():
+            # A single stat covers existence, file type and size
+            try:
+                file_stat = os.stat(file_path)
+            except FileNotFoundError:
                 return False, f"File not found: {file_path}"
             
             # Check if it's a file (not directory)
-            if not file_path.is_file():
+            if not stat.S_ISREG(file_stat.st_mode):
                 return False, f"Path is not a file: {file_path}"
             
             # Check file extension
-            extension = file_path.suffix.lower()
-            if extension not in FileUtils.SUPPORTED_TYPES:
+            extension = os.path.splitext(file_path)[1].lower()
+            max_size = FileUtils.SUPPORTED_TYPES.get(extension)
+            if max_size is None:
                 supported = ', '.join(FileUtils.SUPPORTED_TYPES.keys())
                 return False, f"Unsupported file type: {extension}. Supported: {supported}"
             
             # Check file size
-            file_size = file_path.stat().st_size
-            max_size = FileUtils.SUPPORTED_TYPES[extension]
+            file_size = file_stat.st_size
             if file_size > max_size:
                 return False, f"File too large: {file_size} bytes (max {max_size} bytes for {extension})"
             
@@ -66,27 +98,64 @@ class FileUtils:
         try:
             file_path = Path(file_path)
             
-            if not file_path.exists():
+            try:
+                file_stat = file_path.stat()
+            except FileNotFoundError:
                 return {"error": "File not found"}
             
-            stat = file_path.stat()
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            
-            return {
-                "name": file_path.name,
-                "path": str(file_path.absolute()),
-                "size": stat.st_size,
-                "extension": file_path.suffix.lower(),
-                "mime_type": mime_type,
-                "created": stat.st_ctime,
-                "modified": stat.st_mtime,
-                "is_readable": os.access(file_path, os.R_OK),
-                "is_writable": os.access(file_path, os.W_OK)
-            }
+            return FileUtils._build_file_info(file_path.name, str(file_path.absolute()), file_stat)
             
         except Exception as e:
             return {"error": f"Error getting file info: {e}"}
     
+    @staticmethod
+    def _build_file_info(name: str, path: str, file_stat: os.stat_result) -> dict:
+        """Build the get_file_info dict from an existing stat result"""
+        extension = os.path.splitext(name)[1].lower()
+        
+        return {
+            "name": name,
+            "path": path,
+            "size": file_stat.st_size,
+            "extension": extension,
+            "mime_type": _mime_for_ext(extension),
+            "created": file_stat.st_ctime,
+            "modified": file_stat.st_mtime,
+            "is_readable": os.access(path, os.R_OK),
+            "is_writable": os.access(path, os.W_OK)
+        }
+    
+    @staticmethod
+    def _fast_copy(src, dst) -> None:
+        """
+        Copy file contents in the kernel where possible, then copy metadata like shutil.copy2.
+        Uses copy_file_range, then sendfile, then a plain buffered copy.
+        """
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            try:
+                while os.copy_file_range(src_fd, dst_fd, 1 << 30):
+                    pass
+            except (AttributeError, OSError):
+                # Start over in case a partial copy happened before the failure
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                try:
+                    offset = 0
+                    while True:
+                        sent = os.sendfile(dst_fd, src_fd, offset, 1 << 20)
+                        if not sent:
+                            break
+                        offset += sent
+                except (AttributeError, OSError):
+                    fsrc.seek(0)
+                    fdst.seek(0)
+                    fdst.truncate()
+                    shutil.copyfileobj(fsrc, fdst)
+        
+        shutil.copystat(src, dst)
+    
     @staticmethod
     def prepare_upload_file(source_path: str, upload_dir: str = "temp_uploads") -> str:
         """
@@ -103,16 +172,15 @@ class FileUtils:
                 raise ValueError(error_msg)
             
             # Create upload directory
-            upload_dir.mkdir(exist_ok=True)
+            _ensure_dir(upload_dir)
             
             # Generate unique filename
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = second_timestamp(FILE_TIMESTAMP_FORMAT)
             new_name = f"{timestamp}_{source_path.name}"
             dest_path = upload_dir / new_name
             
             # Copy file
-            shutil.copy2(source_path, dest_path)
+            FileUtils._fast_copy(source_path, dest_path)
             
             logger.info(f"Prepared file for upload: {source_path} -> {dest_path}")
             return str(dest_path)
@@ -127,19 +195,25 @@ class FileUtils:
         try:
             upload_dir = Path(upload_dir)
             
-            if not upload_dir.exists():
+            try:
+                entries = os.scandir(upload_dir)
+            except FileNotFoundError:
                 return
             
-            # Remove all files in the upload directory
-            for file_path in upload_dir.glob("*"):
-                if file_path.is_file():
-                    file_path.unlink()
-                    logger.debug(f"Removed temp file: {file_path}")
+            # Remove all files in the upload directory; DirEntry.is_file uses the cached dirent type
+            with entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        os.unlink(entry.path)
+                        logger.debug(f"Removed temp file: {entry.path}")
             
-            # Remove directory if empty
-            if not any(upload_dir.iterdir()):
+            # Remove directory if empty; rmdir itself refuses a non-empty directory
+            try:
                 upload_dir.rmdir()
-                logger.debug(f"Removed empty temp directory: {upload_dir}")
+            except OSError:
+                return
+            _created_dirs.discard(upload_dir)
+            logger.debug(f"Removed empty temp directory: {upload_dir}")
             
         except Exception as e:
             logger.error(f"Error cleaning up temp files: {e}")
@@ -153,6 +227,15 @@ class FileUtils:
             if not directory.exists():
                 return []
             
+            # Plain suffix patterns like "*.json" don't need glob matching
+            suffix = pattern[1:]
+            if pattern.startswith('*') and not any(c in suffix for c in '*?[/'):
+                with os.scandir(directory) as entries:
+                    return sorted(
+                        str(directory / entry.name) for entry in entries
+                        if entry.name.endswith(suffix) and entry.is_file()
+                    )
+            
             files = []
             for file_path in directory.glob(pattern):
                 if file_path.is_file():
@@ -168,20 +251,24 @@ class FileUtils:
     def get_sample_files(sample_dir: str = "sample_data") -> List[dict]:
         """Get information about available sample files"""
         try:
-            sample_dir = Path(sample_dir)
-            
-            if not sample_dir.exists():
+            if not os.path.isdir(sample_dir):
                 return []
             
             sample_files = []
-            
-            for file_path in sample_dir.glob("*.json"):
-                if file_path.is_file():
-                    info = FileUtils.get_file_info(str(file_path))
-                    if "error" not in info:
-                        sample_files.append(info)
-            
-            return sorted(sample_files, key=lambda x: x['name'])
+            with os.scandir(sample_dir) as entries:
+                for entry in entries:
+                    if not (entry.name.endswith('.json') and entry.is_file()):
+                        continue
+                    try:
+                        file_stat = entry.stat()
+                    except OSError:
+                        # Skip files removed or unreadable mid-scan, as get_file_info errors were skipped
+                        continue
+                    sample_files.append(
+                        FileUtils._build_file_info(entry.name, os.path.abspath(entry.path), file_stat)
+                    )
+            
+            return sorted(sample_files, key=itemgetter('name'))
             
         except Exception as e:
             logger.error(f"Error getting sample files: {e}")
@@ -194,20 +281,19 @@ class FileUtils:
             file_path = Path(file_path)
             backup_dir = Path(backup_dir)
             
-            if not file_path.exists():
+            if not os.path.isfile(file_path):
                 return None
             
             # Create backup directory
-            backup_dir.mkdir(exist_ok=True)
+            _ensure_dir(backup_dir)
             
             # Generate backup filename
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = second_timestamp(FILE_TIMESTAMP_FORMAT)
             backup_name = f"{file_path.stem}_{timestamp}{file_path.suffix}"
             backup_path = backup_dir / backup_name
             
             # Copy file
-            shutil.copy2(file_path, backup_path)
+            FileUtils._fast_copy(file_path, backup_path)
             
             logger.info(f"Created backup: {file_path} -> {backup_path}")
             return str(backup_path)
@@ -3,103 +3,238 @@ JSON Parser utility for Nova Act automation
 Handles different JSON formats and maps them to form fields
 """
 import json
+import functools
 import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
+from types import MappingProxyType
+import orjson
+from file_utils import second_timestamp
+
+try:
+    import ahocorasick
+except ImportError:  # optional; partial matching falls back to a plain substring scan
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# Pattern and translation table built once for the per-value normalizers
+_WEIGHT_RE = re.compile(r'(\d+\.?\d*)')
+_ADDRESS_SEPARATORS = str.maketrans({'|': '\n', ';': '\n'})
+
+# Common date formats keyed by (date separator, has time part). A format can only match
+# strings containing its literal separators, so only one small group is ever tried.
+_DATE_FORMATS_BY_SHAPE = {
+    ('-', False): ('%Y-%m-%d',),
+    ('-', True): ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f'),
+    ('/', False): ('%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d'),
+    ('/', True): ('%m/%d/%Y %H:%M:%S',),
+}
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(date_str: str) -> str:
+    """Parse a date string to YYYY-MM-DD, cached since the same dates recur across shipments"""
+    if '/' in date_str:
+        separator = '/'
+    else:
+        # fromisoformat is implemented in C and far cheaper than strptime
+        try:
+            return datetime.fromisoformat(date_str).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+        separator = '-' if '-' in date_str else None
+    
+    if separator is not None:
+        for fmt in _DATE_FORMATS_BY_SHAPE[separator, ':' in date_str]:
+            try:
+                return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+    
+    # If no format matches, return as-is
+    return date_str
+
+# datetime.isoformat() of a whole second, so parsed_at can use the shared per-second cache
+_PARSED_AT_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# Field mappings from various JSON formats to standard form fields.
+# Keys are standard field names and values are possible JSON keys in priority order.
+_FIELD_MAPPINGS = MappingProxyType({
+    'shipper_name': (
+        'shipper_name', 'shipper', 'sender_name', 'sender', 'from_name', 'from',
+        'origin_name', 'origin_company', 'shipping_company', 'company_name'
+    ),
+    'shipper_address': (
+        'shipper_address', 'shipper_addr', 'sender_address', 'sender_addr', 
+        'from_address', 'from_addr', 'origin_address', 'origin_addr', 'pickup_address'
+    ),
+    'recipient_name': (
+        'recipient_name', 'recipient', 'receiver_name', 'receiver', 'to_name', 'to',
+        'destination_name', 'dest_name', 'customer_name', 'consignee_name', 'consignee'
+    ),
+    'recipient_address': (
+        'recipient_address', 'recipient_addr', 'receiver_address', 'receiver_addr',
+        'to_address', 'to_addr', 'destination_address', 'dest_address', 'delivery_address'
+    ),
+    'package_weight': (
+        'package_weight', 'weight', 'pkg_weight', 'total_weight', 'gross_weight',
+        'shipment_weight', 'parcel_weight', 'item_weight'
+    ),
+    'package_dimensions': (
+        'package_dimensions', 'dimensions', 'pkg_dimensions', 'size', 'measurements',
+        'length_width_height', 'lwh', 'box_size'
+    ),
+    'tracking_number': (
+        'tracking_number', 'tracking_no', 'tracking_id', 'track_number', 'reference_number',
+        'reference_no', 'shipment_id', 'order_number', 'order_id', 'awb_number'
+    ),
+    'shipping_date': (
+        'shipping_date', 'ship_date', 'pickup_date', 'dispatch_date', 'send_date',
+        'departure_date', 'collection_date', 'scheduled_date'
+    ),
+    'special_instructions': (
+        'special_instructions', 'instructions', 'notes', 'comments', 'remarks',
+        'delivery_instructions', 'handling_instructions', 'special_notes', 'description'
+    )
+})
+
+# Reverse lookup: lowercased alias -> (standard field, alias priority)
+_ALIAS_TO_FIELD = MappingProxyType({
+    alias.lower(): (standard_field, rank)
+    for standard_field, aliases in _FIELD_MAPPINGS.items()
+    for rank, alias in enumerate(aliases)
+})
+
+def _index_alias_substrings() -> Dict[str, frozenset]:
+    """Map every substring of every alias to its (field, priority) hits, for data keys that are part of an alias"""
+    substrings = {}
+    for alias, hit in _ALIAS_TO_FIELD.items():
+        for start in range(len(alias) + 1):
+            for end in range(start, len(alias) + 1):
+                substrings.setdefault(alias[start:end], set()).add(hit)
+    return {substring: frozenset(hits) for substring, hits in substrings.items()}
+
+def _build_automaton():
+    """Build an Aho-Corasick automaton over all aliases, or None if pyahocorasick is unavailable"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for alias, hit in _ALIAS_TO_FIELD.items():
+        automaton.add_word(alias, hit)
+    automaton.make_automaton()
+    return automaton
+
+# Priority of an exact match on a field's first alias
+_BEST_MATCH_PRIORITY = (False, 0)
+
+_ALIAS_SUBSTRINGS = _index_alias_substrings()
+# Automaton for aliases that are part of a data key
+_AUTOMATON = _build_automaton()
+
 class JsonParser:
     """JSON parser for shipment data"""
     
+    __slots__ = ('field_mappings', '_alias_to_field', '_alias_substrings', '_automaton')
+    
     def __init__(self):
         """Initialize the JSON parser"""
-        self.field_mappings = self._get_field_mappings()
+        # Shared, read-only lookup tables built once at import
+        self.field_mappings = _FIELD_MAPPINGS
+        self._alias_to_field = _ALIAS_TO_FIELD
+        self._alias_substrings = _ALIAS_SUBSTRINGS
+        self._automaton = _AUTOMATON
     
-    def _get_field_mappings(self) -> Dict[str, List[str]]:
-        """
-        Get field mappings from various JSON formats to standard form fields.
-        Returns a dictionary where keys are standard field names and values are lists of possible JSON keys.
-        """
-        return {
-            'shipper_name': [
-                'shipper_name', 'shipper', 'sender_name', 'sender', 'from_name', 'from',
-                'origin_name', 'origin_company', 'shipping_company', 'company_name'
-            ],
-            'shipper_address': [
-                'shipper_address', 'shipper_addr', 'sender_address', 'sender_addr', 
-                'from_address', 'from_addr', 'origin_address', 'origin_addr', 'pickup_address'
-            ],
-            'recipient_name': [
-                'recipient_name', 'recipient', 'receiver_name', 'receiver', 'to_name', 'to',
-                'destination_name', 'dest_name', 'customer_name', 'consignee_name', 'consignee'
-            ],
-            'recipient_address': [
-                'recipient_address', 'recipient_addr', 'receiver_address', 'receiver_addr',
-                'to_address', 'to_addr', 'destination_address', 'dest_address', 'delivery_address'
-            ],
-            'package_weight': [
-                'package_weight', 'weight', 'pkg_weight', 'total_weight', 'gross_weight',
-                'shipment_weight', 'parcel_weight', 'item_weight'
-            ],
-            'package_dimensions': [
-                'package_dimensions', 'dimensions', 'pkg_dimensions', 'size', 'measurements',
-                'length_width_height', 'lwh', 'box_size'
-            ],
-            'tracking_number': [
-                'tracking_number', 'tracking_no', 'tracking_id', 'track_number', 'reference_number',
-                'reference_no', 'shipment_id', 'order_number', 'order_id', 'awb_number'
-            ],
-            'shipping_date': [
-                'shipping_date', 'ship_date', 'pickup_date', 'dispatch_date', 'send_date',
-                'departure_date', 'collection_date', 'scheduled_date'
-            ],
-            'special_instructions': [
-                'special_instructions', 'instructions', 'notes', 'comments', 'remarks',
-                'delivery_instructions', 'handling_instructions', 'special_notes', 'description'
-            ]
-        }
-    
-    def parse_json_file(self, file_path: str) -> Dict[str, Any]:
+    def parse_json_file(self, file_path: str, include_metadata: bool = False) -> Dict[str, Any]:
         """Parse JSON file and return standardized data"""
         try:
             file_path = Path(file_path)
             if not file_path.exists():
                 raise FileNotFoundError(f"JSON file not found: {file_path}")
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                raw_data = json.load(f)
+            # Parse from bytes so orjson can validate UTF-8 itself
+            with open(file_path, 'rb') as f:
+                raw_data = orjson.loads(f.read())
             
             logger.info(f"Successfully loaded JSON from {file_path}")
-            return self.parse_json_data(raw_data)
+            return self.parse_json_data(raw_data, include_metadata)
             
-        except json.JSONDecodeError as e:
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses this
             logger.error(f"Invalid JSON format in {file_path}: {e}")
             raise
         except Exception as e:
             logger.error(f"Error parsing JSON file {file_path}: {e}")
             raise
     
-    def parse_json_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse JSON data and return standardized format"""
+    def parse_many(self, file_paths: List[str], include_metadata: bool = False) -> List[Dict[str, Any]]:
+        """
+        Parse several JSON files concurrently and return standardized data in input order.
+        Raises the first error encountered, like parse_json_file.
+        """
+        if not file_paths:
+            return []
+        
+        # Parser state is read-only after __init__, so threads can share this instance
+        max_workers = min(len(file_paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda path: self.parse_json_file(path, include_metadata), file_paths))
+    
+    def parse_json_data(self, data: Dict[str, Any], include_metadata: bool = False) -> Dict[str, Any]:
+        """
+        Parse JSON data and return standardized format.
+        A '_metadata' entry with the original keys and found mappings is added only when include_metadata is set.
+        """
         try:
-            # Handle nested structures (e.g., shipment.shipper.name)
-            flattened_data = self._flatten_json(data)
+            # Handle nested structures (e.g., shipment.shipper.name); flat input is used as-is
+            if isinstance(data, dict) and not any(isinstance(v, (dict, list)) for v in data.values()):
+                flattened_data = data
+            else:
+                flattened_data = self._flatten_json(data)
+            
+            # Map to standard fields in a single pass over the data keys.
+            # An exact key beats a case-insensitive one, then earlier aliases win.
+            # An exact hit on a field's first alias can't be beaten, so stop once every field has one.
+            matches = {}
+            unresolved = len(self.field_mappings)
+            for key, value in flattened_data.items():
+                key_lower = key.lower()
+                hit = self._alias_to_field.get(key_lower)
+                if hit is None:
+                    continue
+                standard_field, rank = hit
+                priority = (key != key_lower, rank)
+                best = matches.get(standard_field)
+                if best is None or priority <= best[0]:
+                    matches[standard_field] = (priority, value)
+                    if priority == _BEST_MATCH_PRIORITY:
+                        unresolved -= 1
+                        if not unresolved:
+                            break
             
-            # Map to standard fields
             standardized_data = {}
-            for standard_field, possible_keys in self.field_mappings.items():
-                value = self._find_value_by_keys(flattened_data, possible_keys)
+            partial_matches = None
+            for standard_field in self.field_mappings:
+                match = matches.get(standard_field)
+                if match is not None:
+                    value = match[1]
+                else:
+                    if partial_matches is None:
+                        partial_matches = self._find_partial_matches(flattened_data)
+                    value = partial_matches.get(standard_field)
                 if value is not None:
                     standardized_data[standard_field] = self._normalize_value(standard_field, value)
             
             # Add metadata
-            standardized_data['_metadata'] = {
-                'parsed_at': datetime.now().isoformat(),
-                'original_keys': list(flattened_data.keys()),
-                'found_mappings': {k: v for k, v in standardized_data.items() if not k.startswith('_')}
-            }
+            if include_metadata:
+                standardized_data['_metadata'] = {
+                    'parsed_at': second_timestamp(_PARSED_AT_FORMAT),
+                    'original_keys': list(flattened_data.keys()),
+                    # Copied before '_metadata' is added, so it holds only mapped fields
+                    'found_mappings': standardized_data.copy()
+                }
             
             logger.info(f"Successfully parsed JSON data with {len(standardized_data)} fields")
             return standardized_data
@@ -110,42 +245,55 @@ class JsonParser:
     
     def _flatten_json(self, data: Dict[str, Any], parent_key: str = '', separator: str = '.') -> Dict[str, Any]:
         """Flatten nested JSON structure"""
-        items = []
+        flattened = {}
+        if not isinstance(data, dict):
+            return flattened
         
-        if isinstance(data, dict):
-            for key, value in data.items():
-                new_key = f"{parent_key}{separator}{key}" if parent_key else key
+        # Explicit stack of item iterators keeps the depth-first key order of a recursive walk.
+        # Parsed JSON only contains plain dicts and lists, so exact type checks are enough.
+        _dict, _list = dict, list
+        stack = [(iter(data.items()), parent_key)]
+        push = stack.append
+        while stack:
+            items, prefix = stack[-1]
+            for key, value in items:
+                new_key = f"{prefix}{separator}{key}" if prefix else key
                 
-                if isinstance(value, dict):
-                    items.extend(self._flatten_json(value, new_key, separator).items())
-                elif isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+                value_type = type(value)
+                if value_type is _dict:
+                    push((iter(value.items()), new_key))
+                    break
+                elif value_type is _list and value and type(value[0]) is _dict:
                     # Handle array of objects (take first item)
-                    items.extend(self._flatten_json(value[0], new_key, separator).items())
+                    push((iter(value[0].items()), new_key))
+                    break
                 else:
-                    items.append((new_key, value))
+                    flattened[new_key] = value
+            else:
+                stack.pop()
         
-        return dict(items)
+        return flattened
     
-    def _find_value_by_keys(self, data: Dict[str, Any], possible_keys: List[str]) -> Any:
-        """Find value by trying multiple possible keys"""
-        # Try exact matches first
-        for key in possible_keys:
-            if key in data:
-                return data[key]
-        
-        # Try case-insensitive matches
-        data_lower = {k.lower(): v for k, v in data.items()}
-        for key in possible_keys:
-            if key.lower() in data_lower:
-                return data_lower[key.lower()]
-        
-        # Try partial matches
-        for key in possible_keys:
-            for data_key, value in data.items():
-                if key.lower() in data_key.lower() or data_key.lower() in key.lower():
-                    return value
+    def _find_partial_matches(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Find values by partial key matches, where an alias is part of a data key or vice versa.
+        For each field the earliest alias wins, then the earliest data key.
+        """
+        best = {}
+        for index, (data_key, value) in enumerate(data.items()):
+            key_lower = data_key.lower()
+            hits = set(self._alias_substrings.get(key_lower, ()))
+            if self._automaton is not None:
+                hits.update(hit for _, hit in self._automaton.iter(key_lower))
+            else:
+                hits.update(hit for alias, hit in self._alias_to_field.items() if alias in key_lower)
+            
+            for standard_field, rank in hits:
+                current = best.get(standard_field)
+                if current is None or (rank, index) < current[0]:
+                    best[standard_field] = ((rank, index), value)
         
-        return None
+        return {standard_field: match[1] for standard_field, match in best.items()}
     
     def _normalize_value(self, field_name: str, value: Any) -> str:
         """Normalize value based on field type"""
@@ -158,8 +306,7 @@ class JsonParser:
         # Field-specific normalization
         if field_name == 'package_weight':
             # Extract numeric value
-            import re
-            match = re.search(r'(\d+\.?\d*)', str_value)
+            match = _WEIGHT_RE.search(str_value)
             return match.group(1) if match else str_value
         
         elif field_name == 'shipping_date':
@@ -175,35 +322,16 @@ class JsonParser:
     def _normalize_date(self, date_str: str) -> str:
         """Normalize date string to YYYY-MM-DD format"""
         try:
-            # Common date formats
-            formats = [
-                '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d',
-                '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M:%S',
-                '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f'
-            ]
-            
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(date_str, fmt)
-                    return dt.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-            
-            # If no format matches, return as-is
-            return date_str
-            
+            return _parse_date(date_str)
         except Exception:
             return date_str
     
     def _normalize_address(self, address_str: str) -> str:
         """Normalize address string"""
-        # Replace common separators with newlines
-        address_str = address_str.replace('|', '\n').replace(';', '\n')
-        
-        # Remove extra whitespace
-        lines = [line.strip() for line in address_str.split('\n') if line.strip()]
+        # Turn common separators into newlines in one pass, then drop extra whitespace
+        lines = map(str.strip, address_str.translate(_ADDRESS_SEPARATORS).splitlines())
         
-        return '\n'.join(lines)
+        return '\n'.join(line for line in lines if line)
     
     def validate_parsed_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate parsed data and return validation report"""
@@ -240,8 +368,9 @@ class JsonParser:
         
         if 'shipping_date' in data:
             try:
-                ship_date = datetime.strptime(data['shipping_date'], '%Y-%m-%d')
-                if ship_date < datetime.now():
+                # Normalized dates are ISO YYYY-MM-DD, so the C fromisoformat parser suffices
+                ship_date = date.fromisoformat(data['shipping_date'])
+                if ship_date < date.today():
                     validation_report['warnings'].append('Shipping date is in the past')
             except ValueError:
                 validation_report['warnings'].append('Shipping date format is invalid')
@@ -308,7 +437,7 @@ def main():
         print(f"\n=== Testing Sample Format {i} ===")
         print(f"Original: {json.dumps(sample, indent=2)}")
         
-        parsed = parser.parse_json_data(sample)
+        parsed = parser.parse_json_data(sample, include_metadata=True)
         print(f"Parsed: {json.dumps(parsed, indent=2)}")
         
         validation = parser.validate_parsed_data(parsed)
@@ -5,14 +5,17 @@ This script demonstrates automated web form interactions using Amazon Nova Act.
 """
 
 import os
-import json
+import functools
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import orjson
 from pydantic import BaseModel
 from nova_act import NovaAct
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from json_parser import JsonParser
 from file_utils import FileUtils
 
@@ -28,46 +31,164 @@ class ConfirmationData(BaseModel):
     submission_time: str
     status: str
 
+# Built once at import; pydantic regenerates the schema dict on every call
+_CONFIRMATION_SCHEMA = ConfirmationData.model_json_schema()
+
+def _now_iso() -> str:
+    """Current local time as an ISO 8601 string"""
+    return datetime.now().isoformat()
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent
+
+def _env_flag(value: str) -> bool:
+    """Parse a 'true'/'false' environment value"""
+    return value.lower() == 'true'
+
+def _resolved_path(value: Any) -> Path:
+    """Absolute path, resolved once so later steps can use it as-is"""
+    return Path(value).resolve()
+
+# (config key, environment variable, cast, default)
+_CONFIG_SPEC = (
+    ('portal_url', 'PORTAL_URL', str, 'http://localhost:5000'),
+    ('username', 'PORTAL_USERNAME', str, 'shipping_admin'),
+    ('password', 'PORTAL_PASSWORD', str, 'secure_pass123'),
+    # Default file paths relative to project root
+    ('data_file', 'DATA_FILE', _resolved_path, _PROJECT_ROOT / 'data' / 'samples' / 'shipment_data.json'),
+    ('upload_file', 'UPLOAD_FILE', _resolved_path, _PROJECT_ROOT / 'data' / 'samples' / 'shipment_data.json'),
+    # ('output_bucket', 'OUTPUT_BUCKET', str, ''),
+    # ('aws_region', 'AWS_REGION', str, 'us-east-1'),
+    ('timeout', 'TIMEOUT', int, '300'),
+    ('headless', 'HEADLESS', _env_flag, 'true'),
+    ('nova_act_api_key', 'NOVA_ACT_API_KEY', str, 'YOUR-API-KEY'),
+    
+    # AUTOMATION MODE: Configurable via environment variable
+    ('use_manual_filling', 'USE_MANUAL_FILLING', _env_flag, 'false'),
+)
+
+# Config keys that must never reach logs or result files
+_SECRET_KEYS = {'password', 'nova_act_api_key'}
+
+def _dump_json(data: Dict[str, Any]) -> bytes:
+    """Serialize results to indented JSON bytes; Path values are written as strings"""
+    return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2)
+
+def retry(attempts: int, backoff: Tuple[float, ...], error_message: str) -> Callable:
+    """Retry the decorated call on any exception, sleeping backoff[i] before retry i+1
+
+    Only for idempotent steps. Failed attempts log a warning; error_message is
+    logged at error level once the last attempt has failed.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == attempts - 1:  # Last attempt
+                        logger.error("%s: %s", error_message, e)
+                        raise
+                    delay = backoff[min(attempt, len(backoff) - 1)]
+                    logger.warning("%s attempt %s failed, retrying in %ss: %s", func.__name__, attempt + 1, delay, e)
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
 class NovaActAutomation:
     """Main class for Nova Act automation workflow"""
     
     def __init__(self):
         """Initialize the automation class with configuration"""
-        self.script_dir = Path(__file__).parent
-        self.project_root = self.script_dir.parent.parent
+        self.script_dir = _SCRIPT_DIR
+        self.project_root = _PROJECT_ROOT
         self.config = self._load_config()
         self.json_parser = JsonParser()
         self.file_utils = FileUtils()
+        # The upload path is fixed for the object's lifetime, so check it once here
+        self._upload_abs_path: Path = self.config['upload_file']
+        if not self.config['use_manual_filling']:
+            self._validate_upload_file(self._upload_abs_path)
+        # Browser session and result I/O pool, created by open() and released by close()
+        self._nova: Optional[NovaAct] = None
+        self._logged_in = False
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        
+    def _validate_upload_file(self, upload_file: Path) -> None:
+        """Fail fast if an auto-fill upload file is missing or unsupported"""
+        is_valid, error = self.file_utils.validate_file(str(upload_file))
+        if not is_valid:
+            logger.error("File validation failed: %s", error)
+            raise ValueError(f"File validation failed: {error}")
+        
+    def __enter__(self) -> 'NovaActAutomation':
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def open(self) -> None:
+        """Start the Nova Act browser session shared by every run_one call"""
+        if self._nova is not None:
+            return
+        
+        # Debug: Log Nova Act initialization details
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Initializing Nova Act with:")
+            logger.info("  - Portal URL: %s", self.config['portal_url'])
+            logger.info("  - Headless mode: %s", self.config['headless'])
+            logger.info("  - API Key: %s", 'set' if self.config['nova_act_api_key'] else 'not set')
+        
+        # Initialize Nova Act with proper configuration
+        logger.info("Creating Nova Act instance...")
+        try:
+            nova = NovaAct(
+                starting_page=self.config['portal_url'],
+                headless=self.config['headless'],
+                nova_act_api_key=self.config['nova_act_api_key'],
+                ignore_https_errors=True,
+            )
+            nova.start()
+            logger.info("Nova Act session started successfully!")
+        except Exception as e:
+            logger.error("Nova Act initialization failed with error: %s", e)
+            logger.error("Error type: %s", type(e).__name__)
+            import traceback
+            logger.error("Full traceback: %s", traceback.format_exc())
+            raise
+        
+        self._nova = nova
+        self._logged_in = False
+        # Background pool for result I/O so the browser session can close early
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+    
+    def close(self) -> None:
+        """Stop the browser session, then wait for pending result writes"""
+        nova, self._nova = self._nova, None
+        self._logged_in = False
+        try:
+            if nova is not None:
+                nova.stop()
+        finally:
+            if self._io_pool is not None:
+                self._io_pool.shutdown(wait=True)
+                self._io_pool = None
         
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from environment variables"""
-        # Default file paths relative to project root
-        default_data_file = self.project_root / 'data' / 'samples' / 'shipment_data.json'
-        default_upload_file = self.project_root / 'data' / 'samples' / 'shipment_data.json'
+        config = {key: cast(os.environ.get(env_var, default)) for key, env_var, cast, default in _CONFIG_SPEC}
         
-        config = {
-            'portal_url': os.getenv('PORTAL_URL', 'http://localhost:5000'),
-            'username': os.getenv('PORTAL_USERNAME', 'shipping_admin'),
-            'password': os.getenv('PORTAL_PASSWORD', 'secure_pass123'),
-            'data_file': os.getenv('DATA_FILE', str(default_data_file)),
-            'upload_file': os.getenv('UPLOAD_FILE', str(default_upload_file)),
-            # 'output_bucket': os.getenv('OUTPUT_BUCKET', ''),
-            # 'aws_region': os.getenv('AWS_REGION', 'us-east-1'),
-            'timeout': int(os.getenv('TIMEOUT', '300')),
-            'headless': os.getenv('HEADLESS', 'true').lower() == 'true',
-            'nova_act_api_key': os.getenv('NOVA_ACT_API_KEY', 'YOUR-API-KEY'),
-            
-            # AUTOMATION MODE: Configurable via environment variable
-            'use_manual_filling': os.getenv('USE_MANUAL_FILLING', 'false').lower() == 'true'
-        }
-        
-        logger.info(f"Configuration loaded: {config}")
+        if logger.isEnabledFor(logging.INFO):
+            safe_config = {k: ('***' if k in _SECRET_KEYS else v) for k, v in config.items()}
+            logger.info("Configuration loaded: %s", safe_config)
         return config
     
     def _load_shipment_data(self) -> Dict[str, Any]:
         """Load shipment data from JSON file using JSON parser"""
         try:
-            data_file = Path(self.config['data_file'])
+            data_file = self.config['data_file']
             if not data_file.exists():
                 raise FileNotFoundError(f"Data file not found: {data_file}")
             
@@ -78,179 +199,190 @@ class NovaActAutomation:
             validation_report = self.json_parser.validate_parsed_data(parsed_data)
             
             if not validation_report['is_valid']:
-                logger.warning(f"Data validation failed: {validation_report}")
+                logger.warning("Data validation failed: %s", validation_report)
                 logger.warning("Continuing with available data...")
             
             if validation_report['warnings']:
                 for warning in validation_report['warnings']:
-                    logger.warning(f"Data warning: {warning}")
+                    logger.warning("Data warning: %s", warning)
             
-            logger.info(f"Loaded and parsed shipment data from {data_file}")
-            logger.info(f"Found fields: {validation_report['found_fields']}")
+            logger.info("Loaded and parsed shipment data from %s", data_file)
+            logger.info("Found fields: %s", validation_report['found_fields'])
             
             return parsed_data
         except Exception as e:
-            logger.error(f"Failed to load shipment data: {e}")
+            logger.error("Failed to load shipment data: %s", e)
             raise
     
     # ============================================================================
     # AUTOMATION WORKFLOW METHODS
     # ============================================================================
     
+    @retry(attempts=3, backoff=(0.5, 1.0, 2.0), error_message="Failed to login to portal")
     def login_to_portal(self, nova: NovaAct) -> None:
         """Login to the vendor portal using Nova Act"""
-        try:
-            logger.info("Logging into vendor portal...")
-            
-            # Handle any cookie banners or promotional offers
-            # nova.act("Close any cookie banners or promotional offers if they appear")
-            
-            # Fill in login credentials and submit
-            nova.act(f"Enter '{self.config['username']}' in the username field")
-            nova.act(f"Enter '{self.config['password']}' in the password field")
-            nova.act("Click the login button to submit the form")
-            
-            # Wait for dashboard to load
-            # time.sleep(2)
-            
-            logger.info("Successfully logged into portal")
-        except Exception as e:
-            logger.error(f"Failed to login to portal: {e}")
-            raise
+        logger.info("Logging into vendor portal...")
+        
+        # Handle any cookie banners or promotional offers
+        # nova.act("Close any cookie banners or promotional offers if they appear")
+        
+        # Fill in login credentials and submit
+        nova.act(f"Enter '{self.config['username']}' in the username field")
+        nova.act(f"Enter '{self.config['password']}' in the password field")
+        nova.act("Click the login button to submit the form")
+        
+        # Wait for dashboard to load
+        # time.sleep(2)
+        
+        logger.info("Successfully logged into portal")
     
+    @retry(attempts=3, backoff=(0.5, 1.0, 2.0), error_message="Failed to navigate to shipment form")
     def navigate_to_shipment_form(self, nova: NovaAct) -> None:
         """Navigate to the shipment form"""
-        try:
-            logger.info("Navigating to shipment form...")
-            
-            # Wait a moment for page to fully load
-            # time.sleep(1)
-            
-            # Click on the shipment form link with retry logic
-            for attempt in range(3):
-                try:
-                    nova.act("Click on the 'New Shipment' or 'Shipment Form' link to navigate to the form")
-                    break
-                except Exception as e:
-                    if attempt == 2:  # Last attempt
-                        raise e
-                    logger.warning(f"Navigation attempt {attempt + 1} failed, retrying: {e}")
-                    time.sleep(2)
-            
-            # Wait for form to load
-            # time.sleep(3)
-            
-            logger.info("Navigated to shipment form")
-        except Exception as e:
-            logger.error(f"Failed to navigate to shipment form: {e}")
-            raise
+        logger.info("Navigating to shipment form...")
+        
+        # Wait a moment for page to fully load
+        # time.sleep(1)
+        
+        # Click on the shipment form link (retried by the decorator)
+        nova.act("Click on the 'New Shipment' or 'Shipment Form' link to navigate to the form")
+        
+        # Wait for form to load
+        # time.sleep(3)
+        
+        logger.info("Navigated to shipment form")
     
     # ============================================================================
     # FORM PROCESSING METHODS
     # ============================================================================
     
-    def process_shipment_form(self, nova: NovaAct, shipment_data: Dict[str, Any]) -> None:
+    def process_shipment_form(self, nova: NovaAct, shipment_data: Dict[str, Any],
+                              upload_file: Optional[Path] = None) -> None:
         """Process shipment form based on configured automation mode"""
         if self.config['use_manual_filling']:
             logger.info("Using MANUAL form filling mode")
             self.fill_shipment_form(nova, shipment_data)
         else:
             logger.info("Using AUTO-FILL mode (JSON upload)")
-            self.upload_json_and_autofill(nova)
+            self.upload_json_and_autofill(nova, upload_file)
+    
+    # Form fields in page order, with the label used in Nova Act instructions
+    FORM_FIELDS = (
+        ('shipper_name', 'shipper name'),
+        ('shipper_address', 'shipper address'),
+        ('recipient_name', 'recipient name'),
+        ('recipient_address', 'recipient address'),
+        ('package_weight', 'package weight'),
+        ('package_dimensions', 'package dimensions'),
+        ('tracking_number', 'tracking number'),
+        ('shipping_date', 'shipping date'),
+        ('special_instructions', 'special instructions'),
+    )
+    
+    # Playwright selectors for the form fields (see portal/templates/shipment_form.html)
+    FIELD_SELECTORS = {
+        'shipper_name': 'input[name="shipper_name"]',
+        'shipper_address': 'textarea[name="shipper_address"]',
+        'recipient_name': 'input[name="recipient_name"]',
+        'recipient_address': 'textarea[name="recipient_address"]',
+        'package_weight': 'input[name="package_weight"]',
+        'package_dimensions': 'input[name="package_dimensions"]',
+        'tracking_number': 'input[name="tracking_number"]',
+        'shipping_date': 'input[name="shipping_date"]',
+        'special_instructions': 'textarea[name="special_instructions"]',
+    }
     
     # Function used when manually filling the form
     def fill_shipment_form(self, nova: NovaAct, data: Dict[str, Any]) -> None:
-        """Fill the shipment form with data using Nova Act"""
+        """Fill the shipment form with data using Playwright, falling back to Nova Act"""
         try:
             logger.info("Filling shipment form with data...")
             
-            # Fill shipper information
-            if data.get('shipper_name'):
-                nova.act(f"Enter '{data['shipper_name']}' in the shipper name field")
-            
-            if data.get('shipper_address'):
-                nova.act(f"Enter '{data['shipper_address']}' in the shipper address field")
-            
-            # Fill recipient information
-            if data.get('recipient_name'):
-                nova.act(f"Enter '{data['recipient_name']}' in the recipient name field")
-                
-            if data.get('recipient_address'):
-                nova.act(f"Enter '{data['recipient_address']}' in the recipient address field")
-            
-            # Fill package information
-            if data.get('package_weight'):
-                nova.act(f"Enter '{data['package_weight']}' in the package weight field")
-                
-            if data.get('package_dimensions'):
-                nova.act(f"Enter '{data['package_dimensions']}' in the package dimensions field")
-                
-            if data.get('tracking_number'):
-                nova.act(f"Enter '{data['tracking_number']}' in the tracking number field")
-            
-            # Fill shipping date
-            if data.get('shipping_date'):
-                nova.act(f"Enter '{data['shipping_date']}' in the shipping date field")
+            # The selectors are known, so type values directly instead of asking the model
+            missed = []
+            for key, label in self.FORM_FIELDS:
+                value = data.get(key)
+                if not value:
+                    continue
+                field = nova.page.locator(self.FIELD_SELECTORS[key])
+                try:
+                    field.wait_for(timeout=2000)
+                    field.fill(str(value))
+                except PlaywrightTimeoutError:
+                    missed.append((label, value))
             
-            # Fill special instructions
-            if data.get('special_instructions'):
-                nova.act(f"Enter '{data['special_instructions']}' in the special instructions field")
+            if missed:
+                logger.warning("Form fields not found by selector, using Nova Act: %s", [label for label, _ in missed])
+                self._fill_fields_with_act(nova, missed)
             
             logger.info("Form filled successfully with shipment data")
         except Exception as e:
-            logger.error(f"Failed to fill shipment form: {e}")
+            logger.error("Failed to fill shipment form: %s", e)
             raise
     
+    def _fill_fields_with_act(self, nova: NovaAct, fields: List[Tuple[str, Any]]) -> None:
+        """Fill (label, value) pairs through Nova Act instructions"""
+        # One instruction for all fields saves a model round-trip per field
+        instruction = "Fill the shipment form with the following values: " + "; ".join(
+            f"enter '{value}' in the {label} field" for label, value in fields
+        )
+        try:
+            nova.act(instruction)
+        except Exception as e:
+            logger.warning("Batched form fill failed, filling fields one at a time: %s", e)
+            for label, value in fields:
+                nova.act(f"Enter '{value}' in the {label} field")
+    
     # Function used when auto-filling the form
-    def upload_json_and_autofill(self, nova: NovaAct) -> None:
+    def upload_json_and_autofill(self, nova: NovaAct, upload_file: Optional[Path] = None) -> None:
         """Upload JSON file using proper Nova Act + Playwright approach"""
         try:
-            upload_file = Path(self.config['upload_file'])
-            
-            if not upload_file.exists():
-                logger.error(f"Upload file not found: {upload_file}")
-                raise FileNotFoundError(f"Upload file not found: {upload_file}")
-            
-            logger.info(f"Uploading JSON file for auto-fill: {upload_file}")
+            # Callers validate upload_file; the configured default was validated in __init__
+            upload_file = upload_file or self._upload_abs_path
+            logger.info("Uploading JSON file for auto-fill: %s", upload_file)
             
-            # Validate file
-            if not self.file_utils.validate_file(str(upload_file)):
-                logger.error(f"File validation failed: {upload_file}")
-                raise ValueError(f"File validation failed: {upload_file}")
-            
-            # Convert to absolute path for upload
-            absolute_path = upload_file.resolve()
-            
-            # PROPER APPROACH: Use Nova Act for web interactions, Playwright for file upload
-            # Step 1: Use Nova Act to locate and prepare the file upload element
-            nova.act("Locate the file upload input field on the form")
+            # PROPER APPROACH: Use Playwright for the known file input, Nova Act only as a fallback
+            # Step 1: Wait for the file upload element to be attached to the page
+            file_input = nova.page.locator('input[type="file"]')
+            try:
+                file_input.wait_for(state='attached', timeout=5000)
+            except PlaywrightTimeoutError:
+                logger.warning("File upload input not found by selector, asking Nova Act to locate it")
+                nova.act("Locate the file upload input field on the form")
             
             # Step 2: Use Playwright to handle the actual file selection
             # This bypasses the system dialog issue
-            file_input = nova.page.locator('input[type="file"]')
-            file_input.set_input_files(str(absolute_path))
+            file_input.set_input_files(str(upload_file))
             
             logger.info("File uploaded successfully using Playwright")
             
-            # Step 3: Wait for any auto-processing to complete
-            time.sleep(5)  # Give more time for JavaScript auto-fill to complete
+            # Step 3: Wait for the JavaScript auto-fill to populate the form
+            # (shipping_date is prefilled on page load, so watch tracking_number instead)
+            try:
+                nova.page.wait_for_function(
+                    "() => !!document.querySelector('input[name=\"tracking_number\"]')?.value",
+                    timeout=5000
+                )
+            except PlaywrightTimeoutError:
+                logger.warning("Form was not auto-filled within 5 seconds, continuing")
             
             # Step 4: Use Nova Act to verify the upload was successful (more lenient check)
             try:
                 nova.act("Check if any form fields have been populated or if the file upload field shows a filename")
             except Exception as e:
-                logger.warning(f"Form field verification failed, but continuing: {e}")
+                logger.warning("Form field verification failed, but continuing: %s", e)
                 # Continue anyway - the frontend auto-fill might have worked even if not visually confirmed
             
             logger.info("JSON file uploaded successfully and form processing completed")
         except Exception as e:
-            logger.error(f"Failed to upload JSON file and auto-fill form: {e}")
+            logger.error("Failed to upload JSON file and auto-fill form: %s", e)
             raise
     
     # ============================================================================
     # FORM SUBMISSION & RESULTS
     # ============================================================================
     
+    # Not retried: a retry after the click went through would submit the shipment twice
     def submit_form(self, nova: NovaAct) -> None:
         """Submit the shipment form"""
         try:
@@ -265,7 +397,7 @@ class NovaActAutomation:
             
             logger.info("Form submitted successfully")
         except Exception as e:
-            logger.error(f"Failed to submit form: {e}")
+            logger.error("Failed to submit form: %s", e)
             raise
     
     def capture_confirmation(self, nova: NovaAct) -> Dict[str, Any]:
@@ -276,7 +408,7 @@ class NovaActAutomation:
             # Extract confirmation data using Nova Act with schema
             result = nova.act(
                 "Extract the confirmation number, submission time, and status from the success page",
-                schema=ConfirmationData.model_json_schema()
+                schema=_CONFIRMATION_SCHEMA
             )
             
             if result.matches_schema:
@@ -285,49 +417,51 @@ class NovaActAutomation:
                     'confirmation_number': confirmation.confirmation_number,
                     'submission_time': confirmation.submission_time,
                     'status': confirmation.status,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': _now_iso()
                 }
-                logger.info(f"Captured confirmation: {confirmation_data}")
+                logger.info("Captured confirmation: %s", confirmation_data)
                 return confirmation_data
             else:
                 logger.warning("Failed to extract structured confirmation data")
-                # Fallback to getting raw text
-                result = nova.act("Return all visible text from the success page")
+                # Fallback to getting raw text, reusing the first response when it has any
+                if not result.response:
+                    result = nova.act("Return all visible text from the success page")
                 return {
                     'raw_confirmation': result.response,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': _now_iso()
                 }
         except Exception as e:
-            logger.error(f"Failed to capture confirmation: {e}")
+            logger.error("Failed to capture confirmation: %s", e)
             return {
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _now_iso()
             }
     
     def save_results(self, confirmation: Dict[str, Any]) -> None:
         """Save automation results"""
         try:
+            now = datetime.now()
+            safe_config = {k: v for k, v in self.config.items() if k not in _SECRET_KEYS}
             results = {
                 'automation_run': {
-                    'timestamp': datetime.now().isoformat(),
-                    'config': self.config,
+                    'timestamp': now.isoformat(),
+                    'config': safe_config,
                     'confirmation': confirmation
                 }
             }
             
             # Save locally
-            output_file = f"automation_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(output_file, 'w') as f:
-                json.dump(results, f, indent=2)
+            output_file = f"automation_results_{now.strftime('%Y%m%d_%H%M%S_%f')}.json"
+            Path(output_file).write_bytes(_dump_json(results))
             
-            logger.info(f"Results saved to {output_file}")
+            logger.info("Results saved to %s", output_file)
             
             # Save to S3 if configured
             if self.config.get('output_bucket'):
                 self._save_to_s3(results, output_file)
                 
         except Exception as e:
-            logger.error(f"Failed to save results: {e}")
+            logger.error("Failed to save results: %s", e)
     '''
     def _save_to_s3(self, results: Dict[str, Any], filename: str) -> None:
         """Save results to S3"""
@@ -338,71 +472,71 @@ class NovaActAutomation:
             s3_client.put_object(
                 Bucket=self.config['output_bucket'],
                 Key=f"nova-act-results/{filename}",
-                Body=json.dumps(results, indent=2),
+                Body=_dump_json(results),
                 ContentType='application/json'
             )
             
-            logger.info(f"Results uploaded to S3: s3://{self.config['output_bucket']}/nova-act-results/{filename}")
+            logger.info("Results uploaded to S3: s3://%s/nova-act-results/%s", self.config['output_bucket'], filename)
         except Exception as e:
-            logger.error(f"Failed to save to S3: {e}")
+            logger.error("Failed to save to S3: %s", e)
     '''
+    def run_one(self, shipment_data: Dict[str, Any], upload_file: Optional[Path] = None) -> Dict[str, Any]:
+        """Submit one shipment in the open session and return its confirmation
+        
+        In manual mode the form is filled from shipment_data. In auto-fill mode the
+        portal fills the form from the uploaded file, so shipment_data is not used:
+        pass each record's JSON file as upload_file, otherwise the configured
+        UPLOAD_FILE is submitted every time.
+        """
+        if self._nova is None:
+            raise RuntimeError("Nova Act session is not open; call open() or use a with block")
+        
+        if upload_file is not None and not self.config['use_manual_filling']:
+            upload_file = Path(upload_file).resolve()
+            self._validate_upload_file(upload_file)
+        
+        nova = self._nova
+        try:
+            # Login to portal once per session
+            if not self._logged_in:
+                self.login_to_portal(nova)
+                self._logged_in = True
+            
+            # Navigate to shipment form
+            self.navigate_to_shipment_form(nova)
+            
+            # Process shipment form (mode determined by config)
+            self.process_shipment_form(nova, shipment_data, upload_file) # shipment_data = parsed json data
+            
+            # Submit the form
+            self.submit_form(nova)
+            
+            # Capture confirmation
+            confirmation = self.capture_confirmation(nova)
+            
+            # Save results in the background while the next step (or shutdown) runs
+            self._io_pool.submit(self.save_results, confirmation)
+            
+            return confirmation
+        except Exception as e:
+            logger.error("Shipment submission failed: %s", e)
+            raise
+    
     def run_automation(self) -> None:
-        """Run the complete automation workflow"""
+        """Run the complete automation workflow for the configured data file"""
         try:
             logger.info("Starting Nova Act automation workflow...")
             
             # Load shipment data
             shipment_data = self._load_shipment_data()
             
-            # Debug: Log Nova Act initialization details
-            logger.info(f"Initializing Nova Act with:")
-            logger.info(f"  - Portal URL: {self.config['portal_url']}")
-            logger.info(f"  - Headless mode: {self.config['headless']}")
-            logger.info(f"  - API Key: {self.config['nova_act_api_key'][:8]}...")
+            # Leaving the block closes the browser, then waits for the results file
+            with self:
+                self.run_one(shipment_data)
             
-            # Initialize Nova Act with proper configuration
-            logger.info("Creating Nova Act instance...")
-            try:
-                nova_act_instance = NovaAct(
-                    starting_page=self.config['portal_url'],
-                    headless=self.config['headless'],
-                    nova_act_api_key=self.config['nova_act_api_key'],
-                    ignore_https_errors=True,
-                )
-                logger.info("Nova Act instance created successfully!")
-                
-                with nova_act_instance as nova:
-                    logger.info("Nova Act context manager entered successfully!")
-                    
-                    # Login to portal
-                    self.login_to_portal(nova)
-                    
-                    # Navigate to shipment form
-                    self.navigate_to_shipment_form(nova)
-                    
-                    # Process shipment form (mode determined by config)
-                    self.process_shipment_form(nova, shipment_data) # shipment_data = parsed json data
-                    
-                    # Submit the form
-                    self.submit_form(nova)
-                    
-                    # Capture confirmation
-                    confirmation = self.capture_confirmation(nova)
-                    
-                    # Save results
-                    self.save_results(confirmation)
-                    
-                    logger.info("Automation workflow completed successfully")
-                    
-            except Exception as e:
-                logger.error(f"Nova Act initialization failed with error: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                import traceback
-                logger.error(f"Full traceback: {traceback.format_exc()}")
-                raise
-                
+            logger.info("Automation workflow completed successfully")
         except Exception as e:
-            logger.error(f"Automation workflow failed: {e}")
+            logger.error("Automation workflow failed: %s", e)
             raise
 
 def main():
@@ -412,7 +546,7 @@ def main():
         automation.run_automation()
         logger.info("Nova Act automation completed successfully")
     except Exception as e:
-        logger.error(f"Nova Act automation failed: {e}")
+        logger.error("Nova Act automation failed: %s", e)
         exit(1)
 
 if __name__ == "__main__":
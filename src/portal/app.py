@@ -1,21 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, session, flash
 import os
+import tempfile
 from werkzeug.utils import secure_filename
-import json
+import orjson
 from datetime import datetime
-import random
-import string
+import atexit
+import base64
+import hashlib
+import hmac
+import queue
+import threading
+import time
 
 app = Flask(__name__)
 app.secret_key = 'demo_secret_key_for_poc'
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'txt', 'pdf', 'json', 'csv', 'xml'}
+ALLOWED_EXTENSIONS = frozenset({'txt', 'pdf', 'json', 'csv', 'xml'})
+CONFIRMATION_TIMESTAMP_FORMAT = '%Y%m%d%H%M%S'
+FILE_TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-# Create upload directory if it doesn't exist
+SUBMISSIONS_FOLDER = 'submissions'
+
+# Create upload and submission directories if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(SUBMISSIONS_FOLDER, exist_ok=True)
+
+# Temp files are created 0600; saved uploads get the mode a plain open() would give them
+_umask = os.umask(0)
+os.umask(_umask)
+UPLOAD_FILE_MODE = 0o666 & ~_umask
+
+class UploadRequest(Request):
+    """Request that streams uploaded files straight into the upload folder"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Every temp file created for this request, including ones from a parse that failed
+        self.incoming_uploads = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Same filesystem as the final destination, so saving is just a rename
+        stream = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, prefix='.incoming_', delete=False)
+        self.incoming_uploads.append(stream)
+        return stream
+
+app.request_class = UploadRequest
 
 # Demo credentials (in production, these would be in a database)
 DEMO_CREDENTIALS = {
@@ -23,13 +56,84 @@ DEMO_CREDENTIALS = {
     'logistics_user': 'logistics_pass456'
 }
 
+# Password digests so login can use one lookup and a constant-time compare
+CREDENTIAL_DIGESTS = {
+    username: hashlib.sha256(password.encode()).digest()
+    for username, password in DEMO_CREDENTIALS.items()
+}
+
+class WriteQueue:
+    """Background writer that persists submission files off the request thread"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def put(self, path, data):
+        """Queue bytes to be written to path"""
+        self._ensure_worker()
+        self._queue.put((path, data))
+
+    def _ensure_worker(self):
+        # Started lazily so each pre-forked server worker gets its own thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._worker.start()
+
+    def flush(self):
+        """Block until every queued write has been performed"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path, data = self._queue.get()
+            try:
+                with open(path, 'wb') as f:
+                    f.write(data)
+            except OSError as e:
+                app.logger.error(f"Failed to write {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+write_queue = WriteQueue()
+atexit.register(write_queue.flush)
+
+# Last (epoch second, filename timestamp) pair; the portal is deployed on its own,
+# so it keeps this small cache rather than importing the automation helpers
+_file_timestamp_cache = [0, '']
+
+def file_timestamp():
+    """Filename timestamp for the current second, reformatted only when the second changes"""
+    now = int(time.time())
+    if now != _file_timestamp_cache[0]:
+        _file_timestamp_cache[:] = [now, datetime.fromtimestamp(now).strftime(FILE_TIMESTAMP_FORMAT)]
+    return _file_timestamp_cache[1]
+
+# Keeps ASCII letters, digits, '.', '-' and '_'; every other byte becomes '_'
+SAFE_FILENAME_TABLE = bytes(
+    c if chr(c).isalnum() or chr(c) in '._-' else ord('_')
+    for c in range(256)
+)
+
+def safe_filename(filename):
+    """Sanitize an upload filename in one translate pass, deferring to secure_filename for non-ASCII"""
+    if not filename.isascii():
+        return secure_filename(filename)
+    return filename.encode('ascii').translate(SAFE_FILENAME_TABLE).decode('ascii').strip('._')
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    dot = filename.rfind('.')
+    return dot != -1 and filename[dot + 1:].lower() in ALLOWED_EXTENSIONS
 
 def generate_confirmation_number():
     """Generate a unique confirmation number"""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
+    timestamp = datetime.now().strftime(CONFIRMATION_TIMESTAMP_FORMAT)
+    # Base32 of 3 random bytes gives uppercase letters and digits, like the old suffix
+    random_suffix = base64.b32encode(os.urandom(3))[:4].decode()
     return f"CONF-{timestamp}-{random_suffix}"
 
 @app.route('/')
@@ -44,7 +148,8 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        if username in DEMO_CREDENTIALS and DEMO_CREDENTIALS[username] == password:
+        expected = CREDENTIAL_DIGESTS.get(username)
+        if expected and hmac.compare_digest(expected, hashlib.sha256(password.encode()).digest()):
             session['username'] = username
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard'))
@@ -90,34 +195,50 @@ def shipment_form():
         if 'shipment_document' in request.files:
             file = request.files['shipment_document']
             if file and file.filename != '' and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
+                filename = safe_filename(file.filename)
+                filename = f"{file_timestamp()}_{filename}"
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+                file.stream.close()
+                os.replace(file.stream.name, filepath)
+                os.chmod(filepath, UPLOAD_FILE_MODE)
                 uploaded_file = filename
                 form_data['uploaded_file'] = filename
         
-        # Save submission data
-        submission_file = f"submissions/{datetime.now().strftime('%Y%m%d_%H%M%S')}_submission.json"
-        os.makedirs('submissions', exist_ok=True)
-        with open(submission_file, 'w') as f:
-            json.dump(form_data, f, indent=2)
+        # Save submission data (random tag keeps same-second submissions apart)
+        submission_file = f"{SUBMISSIONS_FOLDER}/{file_timestamp()}_{os.urandom(2).hex()}_submission.json"
+        write_queue.put(submission_file, orjson.dumps(form_data, option=orjson.OPT_INDENT_2))
         
         flash('Shipment form submitted successfully!', 'success')
         return render_template('submission_success.html', form_data=form_data)
     
     return render_template('shipment_form.html')
 
+@app.teardown_request
+def discard_unsaved_uploads(exc):
+    """Remove streamed upload files that were rejected or never saved"""
+    # Saved uploads were already renamed away, so only leftovers remain to delete
+    for stream in getattr(request, 'incoming_uploads', ()):
+        stream.close()
+        try:
+            os.unlink(stream.name)
+        except FileNotFoundError:
+            pass
+
 @app.route('/logout')
 def logout():
     session.clear()
     flash('You have been logged out', 'info')
     return redirect(url_for('login'))
 
+# Fixed framing of the health response; only the timestamp changes per call
+HEALTH_RESPONSE_PREFIX = b'{"status":"healthy","timestamp":"'
+HEALTH_RESPONSE_SUFFIX = b'"}'
+
 @app.route('/api/health')
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    timestamp = datetime.now().isoformat().encode()
+    return Response(HEALTH_RESPONSE_PREFIX + timestamp + HEALTH_RESPONSE_SUFFIX, mimetype='application/json')
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see Dockerfile)
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file